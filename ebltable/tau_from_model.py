@@ -4,7 +4,6 @@ Class to read gamma-ray absorption from EBL models
 
 # ---- IMPORTS -----------------------------------------------#
 import numpy as np
-from scipy.integrate import simps
 from scipy.interpolate import RectBivariateSpline as RBSpline
 from scipy.interpolate import UnivariateSpline as USpline
 from astropy.io import fits
@@ -12,7 +11,234 @@ from astropy.table import Table,Column
 import astropy.units as u
 import warnings
 import os
+import copy
+import functools
+import tempfile
+from collections import OrderedDict
+try:
+    from numba import njit, prange
+except ImportError:
+    njit = None
+# np.loadtxt uses a C parser since numpy 1.23, 
+# for older versions the pandas parser is faster
+if tuple(int(v) for v in np.__version__.split('.')[:2]) < (1, 23):
+    try:
+        import pandas as pd
+    except ImportError:
+        pd = None
+else:
+    pd = None
 # ------------------------------------------------------------#
+def _is_sorted(a):
+    """Check if 1d array is sorted in non-decreasing order"""
+    return (np.diff(a) >= 0.).all()
+
+def _fast_loadtxt(file_name, usecols = None):
+    """
+    Read a whitespace separated ascii table into a 2d numpy array. 
+    For numpy < 1.23, the C parser of pandas is used if available, 
+    otherwise np.loadtxt. Lines starting with '#' are ignored.
+    """
+    if pd is not None:
+        try:
+            return pd.read_csv(file_name, sep = r'\s+', header = None, comment = '#',
+                                usecols = usecols, dtype = np.float64,
+                                float_precision = 'round_trip').values
+        except ValueError:
+            pass
+    return np.loadtxt(file_name, usecols = usecols)
+
+def _load_table(file_name, EGeV_per_unit = 1.):
+    """
+    Read (z, EGeV, tau) from a (n+1) x (m+1) table with redshifts in the first row 
+    and energies in the first column, which are converted to GeV 
+    by multiplying with EGeV_per_unit
+    """
+    data = _fast_loadtxt(file_name)
+    z = data[0,1:]
+    tau = data[1:,1:]
+    EGeV = data[1:,0] * EGeV_per_unit
+    return z, EGeV, tau
+
+def _load_TeV_table(file_name):
+    """Read (z, EGeV, tau) from a table with energies in TeV"""
+    return _load_table(file_name, EGeV_per_unit = 1e3)
+
+def _load_MeV_table(file_name):
+    """Read (z, EGeV, tau) from a table with energies in MeV"""
+    return _load_table(file_name, EGeV_per_unit = 1e-3)
+
+def _load_kneiske(file_name):
+    """Read (z, EGeV, tau) from the Kneiske & Dole table with log10 energies in GeV"""
+    z, logEGeV, tau = _load_table(file_name)
+    return z, np.power(10.,logEGeV), tau
+
+def _load_franceschini(file_name):
+    """Read (z, EGeV, tau) from the Franceschini et al. table"""
+    # table consists of blocks of 50 energies 
+    # for redshifts 0.001, 0.002, ...
+    nE = 50
+    data = _fast_loadtxt(file_name,usecols=(0,2))
+    Nz = data.shape[0] // nE
+    EGeV = data[:nE,0]*1e3
+    tau = data[:Nz*nE,1].reshape(Nz,nE).T
+    z = 1e-3*np.arange(1.,Nz+1.)
+    return z, EGeV, tau
+
+# model name: (file name in data directory, function returning (z, EGeV, tau))
+_MODELS = {
+    'kneiske': ('tau_ebl_cmb_kneiske.dat', _load_kneiske),
+    'franceschini': ('tau_fran08.dat', _load_franceschini),
+    'dominguez': ('tau_dominguez11_cta.out', _load_TeV_table),
+    'dominguez-upper': ('tau_upper_dominguez11_cta.out', _load_TeV_table),
+    'dominguez-lower': ('tau_lower_dominguez11_cta.out', _load_TeV_table),
+    'finke': ('tau_modelC_Finke.txt', _load_TeV_table),
+    'inoue': ('tau_gg_baseline.dat', _load_TeV_table),
+    'inoue-low-pop3': ('tau_gg_low_pop3.dat', _load_TeV_table),
+    'inoue-up-pop3': ('tau_gg_up_pop3.dat', _load_TeV_table),
+    'gilmore': ('opdep_fiducial.dat', _load_MeV_table),
+    'gilmore-fixed': ('opdep_fixed.dat', _load_MeV_table),
+}
+
+# version of the binary table copies, increase whenever a loader changes
+_TABLE_CACHE_VERSION = 1
+
+def _read_table_cache(file_name):
+    """
+    Return (z, EGeV, tau) from the binary copy file_name + '.npz' 
+    of a parsed model file, or None if it does not exist, is older than file_name, 
+    was written with a different _TABLE_CACHE_VERSION, or cannot be read.
+    """
+    cache = file_name + '.npz'
+    try:
+        if os.path.getmtime(cache) < os.path.getmtime(file_name):
+            return None
+        with np.load(cache) as d:
+            if int(d['version']) != _TABLE_CACHE_VERSION:
+                return None
+            return d['z'], d['EGeV'], d['tau']
+    except Exception:
+        # missing or damaged file, fall back to the ascii table
+        return None
+
+def _write_table_cache(file_name, z, EGeV, tau):
+    """
+    Save (z, EGeV, tau) of a parsed model file to file_name + '.npz'. 
+    The file is written to a temporary file first and then moved into place, 
+    so that readers never see a partially written file.
+    Nothing is done if the file cannot be written, e.g. in read-only installations.
+    """
+    cache = file_name + '.npz'
+    try:
+        fd, tmp = tempfile.mkstemp(suffix = '.npz', dir = os.path.dirname(cache))
+    except OSError:
+        return
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            np.savez(f, version=_TABLE_CACHE_VERSION, z=z, EGeV=EGeV, tau=tau)
+        # mkstemp creates the file readable by the owner only, 
+        # make the copy readable for all users of the installation
+        os.chmod(tmp, 0o644)
+        os.replace(tmp, cache)
+    except Exception:
+        try:
+            os.remove(tmp)
+        except OSError:
+            pass
+    return
+
+def _simpson_weights(n):
+    """
+    Weights of the composite Simpson rule for n equally spaced points 
+    with unit spacing. For an even number of points, the average of 
+    Simpson's rule on the first (last) n-1 points and the trapezoidal rule
+    on the last (first) interval is used, as in scipy.integrate.simps
+    with even = 'avg'.
+    """
+    if n < 3:
+        return np.full(n, 0.5) if n == 2 else np.zeros(n)
+
+    if n % 2:
+        w = np.ones(n)
+        w[1:-1:2] = 4.
+        w[2:-1:2] = 2.
+        return w / 3.
+
+    w_odd = _simpson_weights(n - 1)
+    w = np.zeros(n)
+    w[:-1] += w_odd
+    w[-2:] += 0.5
+    w[1:] += w_odd
+    w[:2] += 0.5
+    return 0.5 * w
+
+def _simpson_weighted(weights, t_array, w_simps):
+    """
+    Weighted average of the optical depth in each energy bin
+    from Simpson integration, numpy version.
+
+    weights: (n-1) x Esteps array with spectral weights 
+    t_array: m x (n-1) x Esteps array with optical depth values
+    w_simps: Esteps-dim array with Simpson weights
+    """
+    return np.dot(weights * t_array, w_simps) / np.dot(weights, w_simps)
+
+if njit is not None:
+    @njit(parallel=True, fastmath=True, cache=True)
+    def _simpson_weighted(weights, t_array, w_simps):
+        """
+        Weighted average of the optical depth in each energy bin
+        from Simpson integration, numba version parallelized over the bins.
+
+        weights: (n-1) x Esteps array with spectral weights 
+        t_array: m x (n-1) x Esteps array with optical depth values
+        w_simps: Esteps-dim array with Simpson weights
+        """
+        nz, nbin, nsteps = t_array.shape
+        result = np.empty((nz, nbin))
+        for j in prange(nbin):
+            norm = 0.
+            for k in range(nsteps):
+                norm += weights[j,k] * w_simps[k]
+            for i in range(nz):
+                num = 0.
+                for k in range(nsteps):
+                    num += weights[j,k] * t_array[i,j,k] * w_simps[k]
+                result[i,j] = num / norm
+        return result
+
+if njit is not None:
+    @njit(fastmath=True, cache=True)
+    def _bilinear(logE_grid, z_grid, tau, logE, z, out):
+        """
+        Bilinear interpolation of the n x m table tau on the grid (logE_grid, z_grid) 
+        for unsorted energies logE and redshifts z. 
+        Values outside the grid are evaluated at the grid boundaries.
+        The result is written to the len(logE) x len(z) array out, which is returned.
+        """
+        nx = logE_grid.size
+        ny = z_grid.size
+
+        # redshift indices and weights are shared by all energies
+        iy = np.empty(z.size, dtype=np.int64)
+        ty = np.empty(z.size)
+        for j in range(z.size):
+            zj = min(max(z[j], z_grid[0]), z_grid[ny - 1])
+            k = min(max(np.searchsorted(z_grid, zj) - 1, 0), ny - 2)
+            iy[j] = k
+            ty[j] = (zj - z_grid[k]) / (z_grid[k + 1] - z_grid[k])
+
+        for i in range(logE.size):
+            xi = min(max(logE[i], logE_grid[0]), logE_grid[nx - 1])
+            k = min(max(np.searchsorted(logE_grid, xi) - 1, 0), nx - 2)
+            tx = (xi - logE_grid[k]) / (logE_grid[k + 1] - logE_grid[k])
+            for j in range(z.size):
+                l = iy[j]
+                out[i,j] = (1. - tx) * (1. - ty[j]) * tau[k,l] + \
+                            tx * (1. - ty[j]) * tau[k + 1,l] + \
+                            (1. - tx) * ty[j] * tau[k,l + 1] + \
+                            tx * ty[j] * tau[k + 1,l + 1]
+        return out
 
 
 class OptDepth(object):
@@ -30,9 +256,10 @@ class OptDepth(object):
     logEGeV:        log10 energy in GeV, n-dim numpy array, given by model file
     tau:        nxm - dim array with optical depth values, given by model file
     """
-    
+    # maximum number of redshifts for which inverse splines are cached
+    _inverse_cache_size = 16
 
-    def __init__(self, z, EGeV, tau,kx = 2, ky = 2):
+    def __init__(self, z, EGeV, tau,kx = 2, ky = 2, dtype = np.float64):
         """
         Initiate Optical depth model class. 
 
@@ -53,12 +280,20 @@ class OptDepth(object):
             order of interpolation spline along energy axis, default: 2
         ky: int
             order of interpolation spline along energy axis, default: 2
+        dtype: numpy dtype
+            data type in which the optical depth table is stored, default: np.float64.
+            Use np.float32 to halve the memory of the table. 
+            The spline itself and the returned optical depths are always double precision.
         """
 
         self._z = np.array(z)
         self._logEGeV = np.log10(EGeV)
-        self._tau = np.array(tau)
-        self._tauSpline = RBSpline(self._logEGeV,self._z,self._tau,kx=kx,ky=ky)
+        self._dtype = dtype
+        self._tau = np.array(tau, dtype=dtype)
+        self._kx = kx
+        self._ky = ky
+        self.rebuild()
+        self._simps_weights = {}
         return
 
     @property
@@ -66,9 +301,10 @@ class OptDepth(object):
         return self._z
 
     @z.setter
-    def z(self,z,kx = 2, ky = 2):
-        self._z = z
-        self._tauSpline = RBSpline(self._logEGeV,self._z,self._tau,kx=kx,ky=ky)
+    def z(self,z):
+        self._z = np.array(z)
+        # spline is rebuilt lazily on the next evaluation
+        self._tauSpline = None
         return 
 
     @property
@@ -76,9 +312,10 @@ class OptDepth(object):
         return self._logEGeV
 
     @logEGeV.setter
-    def logEGeV(self,EGeV,kx = 2, ky = 2):
+    def logEGeV(self,EGeV):
         self._logEGeV = np.log10(EGeV)
-        self._tauSpline = RBSpline(self._logEGeV,self._z,self._tau,kx=kx,ky=ky)
+        # spline is rebuilt lazily on the next evaluation
+        self._tauSpline = None
         return 
 
     @property
@@ -86,13 +323,26 @@ class OptDepth(object):
         return self._tau
 
     @tau.setter
-    def tau(self,tau,kx = 2, ky = 2):
-        self._tau = tau
-        self._tauSpline = RBSpline(self._logEGeV,self._z,self._tau,kx=kx,ky=ky)
+    def tau(self,tau):
+        self._tau = np.asarray(tau, dtype=self._dtype)
+        # spline is rebuilt lazily on the next evaluation
+        self._tauSpline = None
         return 
 
+    def rebuild(self):
+        """
+        (Re)build the interpolation spline of the optical depth table.
+
+        Changing z, logEGeV, or tau only invalidates the spline, 
+        which is then rebuilt on the next call of opt_depth or opt_depth_inverse.
+        Call this function to rebuild it right away.
+        """
+        self._tauSpline = RBSpline(self._logEGeV,self._z,self._tau,kx=self._kx,ky=self._ky)
+        self._inverse_splines = OrderedDict()
+        return
+
     @staticmethod
-    def readmodel(model, kx = 2, ky = 2):
+    def readmodel(model, kx = 2, ky = 2, dtype = np.float64):
         """
         Read in an EBL model from an EBL model file
 
@@ -101,6 +351,16 @@ class OptDepth(object):
         model:                str, 
                         EBL model to use.
                         Currently supported models are listed in Notes Section
+
+        {options}
+
+        kx: int
+            order of interpolation spline along energy axis, default: 2
+        ky: int
+            order of interpolation spline along energy axis, default: 2
+        dtype: numpy dtype
+            data type in which the optical depth table is stored, default: np.float64
+
         Notes
         -----
         Supported EBL models:
@@ -116,71 +376,19 @@ class OptDepth(object):
         inuoe-up-pop3        Inuoe et al. (2013), (up pop 3) http://www.slac.stanford.edu/~yinoue/Download.html
         gilmore              Gilmore et al. (2012) (fiducial model)
         gilmore-fixed        Gilmore et al. (2012) (fixed model)
-        """
-        ebl_file_path = os.path.join(os.path.split(__file__)[0],'data/')
-
-        if model == 'kneiske' or model.find('dominguez') >= 0 or model == 'finke':
-            if model == 'kneiske':
-                file_name = os.path.join(ebl_file_path, 'tau_ebl_cmb_kneiske.dat')
-            elif model == 'dominguez':
-                file_name = os.path.join(ebl_file_path, 'tau_dominguez11_cta.out')
-            elif model == 'dominguez-upper':
-                file_name = os.path.join(ebl_file_path, 'tau_upper_dominguez11_cta.out')
-            elif model == 'dominguez-lower':
-                file_name = os.path.join(ebl_file_path, 'tau_lower_dominguez11_cta.out')
-            elif model == 'finke':
-                file_name = os.path.join(ebl_file_path, 'tau_modelC_Finke.txt')
-            else:
-                raise ValueError("Unknown EBL model chosen!")
 
-            data = np.loadtxt(file_name)
-            z = data[0,1:]
-            tau = data[1:,1:]
-            if model == 'kneiske':
-                EGeV = np.power(10.,data[1:,0])
-            else:
-                EGeV = data[1:,0]*1e3
-
-        elif model == 'franceschini':
-            file_name = os.path.join(ebl_file_path , 'tau_fran08.dat')
-
-            data = np.loadtxt(file_name,usecols=(0,2))
-            EGeV = data[0:50,0]*1e3
-            tau = np.zeros((len(EGeV),int(len(data[:,1])/len(EGeV))))
-            z = np.zeros(int(len(data[:,1])/len(EGeV)))
-            for i in range(z.size):
-                tau[:,i] = data[i*50:i*50+50,1]
-                z[i] += 1e-3*(i+1.)
-
-        elif model.find('inoue') >= 0:
-            if model == 'inoue':
-                file_name = os.path.join(ebl_file_path , 'tau_gg_baseline.dat')
-            elif model == 'inoue-low-pop3':
-                file_name = os.path.join(ebl_file_path , 'tau_gg_low_pop3.dat')
-            elif model == 'inoue-up-pop3':
-                file_name = os.path.join(ebl_file_path , 'tau_gg_up_pop3.dat')
-            else:
-                raise ValueError("Unknown EBL model chosen!")
-            data = np.loadtxt(file_name)
-            z = data[0,1:]
-            tau = data[1:,1:]
-            EGeV = data[1:,0]*1e3
-
-        elif model.find('gilmore') >= 0:
-            if model == 'gilmore':
-                file_name = os.path.join(ebl_file_path , 'opdep_fiducial.dat')
-            elif model == 'gilmore-fixed':
-                file_name = os.path.join(ebl_file_path , 'opdep_fixed.dat')
-            else:
-                raise ValueError("Unknown EBL model chosen!")
-            data = np.loadtxt(file_name)
-            z = data[0,1:]
-            tau = data[1:,1:]
-            EGeV = data[1:,0]/1e3
-        else:
+        After the first read, the parsed tables are stored as binary .npz files 
+        next to the model files (if the directory is writable), 
+        which are used as long as they are newer than the model files.
+        Within a session, models are read and their splines are built only once 
+        for each combination of model, kx, ky, and dtype; 
+        every call returns an independent copy.
+        """
+        if model not in _MODELS:
             raise ValueError("Unknown EBL model chosen!")
 
-        return OptDepth(z,EGeV, tau, kx=kx, ky=ky)
+        # the cached instance is shared, return an independent copy
+        return copy.deepcopy(_load_model(model, kx, ky, np.dtype(dtype)))
 
     @staticmethod
     def readascii(file_name):
@@ -197,11 +405,7 @@ class OptDepth(object):
                         The remaining values are the tau values. 
                         The [0,0] entry will be ignored.
         """
-        data = np.loadtxt(file_name)
-        z = data[0,1:]
-        tau = data[1:,1:]
-        EGeV = data[1:,0]
-        return OptDepth(z, EGeV, tau)
+        return OptDepth(*_load_table(file_name))
 
     @staticmethod
     def readfits(file_name,
@@ -265,6 +469,32 @@ class OptDepth(object):
         hdulist.writeto(filename, overwrite = True)
         return
 
+    if njit is not None:
+        def _eval_bilinear(self, logE, z):
+            """
+            Bilinear interpolation of the optical depth table with the compiled 
+            _bilinear kernel, equivalent to the spline with kx = ky = 1.
+            As for the spline, values outside the table range are 
+            evaluated at the table boundaries.
+
+            Only available with numba: a numpy version is 3-5 times slower 
+            than the spline, so opt_depth uses the spline without numba.
+
+            Parameters
+            ----------
+            logE: `~numpy.ndarray`
+                log10 of energies in GeV, n-dimensional, does not need to be sorted
+            z: `~numpy.ndarray`
+                redshifts, m-dimensional, does not need to be sorted
+
+            Returns
+            -------
+            n x m `~numpy.ndarray` with optical depth values
+            """
+            out = np.empty((logE.size, z.size))
+            return _bilinear(self._logEGeV, self._z, self._tau, 
+                             np.asarray(logE, dtype=np.float64), np.asarray(z, dtype=np.float64), out)
+
     def opt_depth(self,z,ETeV):
         """
         Returns optical depth for redshift z and Engergy (TeV) from BSpline Interpolation for z,E arrays
@@ -272,62 +502,88 @@ class OptDepth(object):
         Parameters
         ----------
         z: `~numpy.ndarray` or list
-            source redshift, m-dimensional
+            source redshift, m-dimensional, can be of arbitrary shape
 
         ETeV: `~numpy.ndarray` or list
-            Energies in TeV, n-dimensional
+            Energies in TeV, n-dimensional, can be of arbitrary shape
 
         Returns
         -------
         (N x M) `~numpy.ndarray` with corresponding optical depth values.
-        If z or E are scalars, the corresponding axis will be squezed.
+        If z and ETeV are scalars or 1d, axes of length one are squeezed, 
+        i.e. scalar input gives a scalar. 
+        If z or ETeV is multi-dimensional, the shape is always z.shape + ETeV.shape.
 
         Notes
         -----
         if any z < self._z (from interpolation table), self._z[0] is used and RuntimeWarning is issued.
         This might overestimate the optical depth!
 
+        If z and ETeV are already sorted in increasing order, the spline is evaluated 
+        directly. Otherwise, the input is sorted first and the result is permuted back 
+        to the original order.
+
+        If numba is installed and kx = ky = 1, a compiled bilinear interpolation 
+        of the table is used instead of the spline.
+
         """
-        if np.isscalar(ETeV):
-            ETeV = np.array([ETeV])
-        elif type(ETeV) == list:
-            ETeV = np.array(ETeV)
-        if np.isscalar(z):
-            z = np.array([z])
-        elif type(z) == list:
-            z = np.array(z)
-
-        if np.any(z < self._z[0]): warnings.warn(
+        z = np.asarray(z, dtype=np.float64)
+        ETeV = np.asarray(ETeV, dtype=np.float64)
+
+        # evaluate on flattened 1d arrays, output is reshaped at the end
+        shape = z.shape + ETeV.shape
+        squeeze = z.ndim <= 1 and ETeV.ndim <= 1
+        z = z.ravel()
+        ETeV = ETeV.ravel()
+
+        if z.size and z.min() < self._z[0]: warnings.warn(
             "Warning: a z value is below interpolation range, zmin = {0:.2f}".format(self._z[0]), 
             RuntimeWarning)
 
-        result = np.zeros((z.shape[0],ETeV.shape[0]))
-        tt = np.zeros((z.shape[0],ETeV.shape[0]))
+        # log10 of energies in GeV
+        logE = np.log10(ETeV) + 3.
 
-        args_z = np.argsort(z)
-        args_E = np.argsort(ETeV)
+        # with numba, the compiled bilinear interpolation is faster than 
+        # the linear spline and does not require sorted input
+        if njit is not None and self._kx == 1 and self._ky == 1:
+            result = self._eval_bilinear(logE,z).T
 
-        # Spline interpolation requires sorted lists
-        tt[args_z,:] = self._tauSpline(np.log10(np.sort(ETeV)*1e3),np.sort(z)).transpose()
-        result[:,args_E] = tt
+        else:
+            if self._tauSpline is None:
+                self.rebuild()
 
-        return np.squeeze(result)
+            # fast path: spline interpolation requires sorted lists
+            if _is_sorted(z) and _is_sorted(logE):
+                result = self._tauSpline(logE,z).T
 
-    def opt_depth_inverse(self, z, tau):
-        """
-        Return Energy in GeV for redshift z and optical depth tau from BSpline Interpolation
+            else:
+                args_z = np.argsort(z)
+                args_E = np.argsort(logE)
 
-        Parameter
-        ---------
-        z:        float, 
-                redshift
-        tau:        float, 
-                optical depth
+                result = self._tauSpline(logE[args_E],z[args_z])
 
-        Returns
-        -------
-        float, energy in GeV
+                # inverse permutations to restore the input order
+                inv_z = np.empty_like(args_z)
+                inv_z[args_z] = np.arange(args_z.size)
+                inv_E = np.empty_like(args_E)
+                inv_E[args_E] = np.arange(args_E.size)
+
+                result = result.T[np.ix_(inv_z, inv_E)]
+
+        result = result.reshape(shape)
+        if squeeze:
+            return np.squeeze(result)
+        return result
+
+    def _inverse_spline(self, z):
         """
+        Return spline of log10 energy in GeV vs optical depth for redshift z.
+        Splines for the last few redshifts are cached.
+        """
+        z = float(z)
+        if z in self._inverse_splines:
+            self._inverse_splines.move_to_end(z)
+            return self._inverse_splines[z]
 
         tau_array = self._tauSpline(self._logEGeV,z)[:,0]
 
@@ -344,7 +600,40 @@ class OptDepth(object):
         Enew = USpline(tau_array[mask],self._logEGeV[mask],
                 s = 0, k = 1, ext = 'extrapolate')
 
-        return np.power(10.,Enew(tau))
+        self._inverse_splines[z] = Enew
+        if len(self._inverse_splines) > self._inverse_cache_size:
+            self._inverse_splines.popitem(last = False)
+        return Enew
+
+    def opt_depth_inverse(self, z, tau):
+        """
+        Return Energy in GeV for redshift z and optical depth tau from BSpline Interpolation
+
+        Parameter
+        ---------
+        z:        float or `~numpy.ndarray` or list, 
+                redshift
+        tau:        float, 
+                optical depth
+
+        Returns
+        -------
+        float, energy in GeV.
+        If z is an array, an array with the energies for each redshift is returned.
+
+        Notes
+        -----
+        The interpolation of energy vs. optical depth is cached for 
+        the last 16 redshift values.
+        """
+
+        if self._tauSpline is None:
+            self.rebuild()
+
+        if np.ndim(z) == 0:
+            return np.power(10.,self._inverse_spline(z)(tau))
+
+        return np.array([np.power(10.,self._inverse_spline(zz)(tau)) for zz in z])
 
     def opt_depth_Ebin(self,z,Ebin,func,params,Esteps = 50):
         """
@@ -352,8 +641,8 @@ class OptDepth(object):
 
         Parameters
         ----------
-        z:        float, 
-                redshift
+        z:        float or `~numpy.ndarray` or list
+                redshift, m-dimensional
         Ebin:         `~numpy.ndarray` or list
                 Energies of bin bounds in TeV, n-dimensional
         func:        function pointer
@@ -370,22 +659,62 @@ class OptDepth(object):
         Returns
         -------
         (n-1)-dim `~numpy.ndarray` with average tau values for each energy bin.
+        If z is an array, an m x (n-1) array is returned.
 
         Notes
         -----
         Any energy dispersion is neglected.
+
+        If numba is installed, the weighted Simpson integration is 
+        carried out in a compiled kernel, parallelized over the energy bins.
+        The spectrum func is always evaluated in python and 
+        does not need to be numba compatible.
         """
-        # design a 2d matrix with energy integration steps
-        logE_array = []
-        t_array = []
-        for i,E in enumerate(Ebin):
-            if i == len(Ebin) - 1:
-                break
-            logE_array.append(np.linspace(np.log(E),np.log(Ebin[i+1]),Esteps))
-            t_array.append(self.opt_depth(z,np.exp(logE_array)))
-
-        logE_array = np.array(logE_array)
-        t_array = np.array(t_array)
-        # return averaged tau value
-        return simps(func(np.exp(logE_array),**params) * t_array * np.exp(logE_array), logE_array, axis = 1) / \
-                simps(func(np.exp(logE_array),**params) * np.exp(logE_array), logE_array, axis = 1)
+        # design a 2d matrix with energy integration steps, 
+        # shape (n-1) x Esteps
+        Ebin = np.asarray(Ebin, dtype=np.float64)
+        logE_lo = np.log(Ebin[:-1])
+        logE_hi = np.log(Ebin[1:])
+        steps = np.linspace(0., 1., Esteps)
+        logE_array = np.empty((Ebin.size - 1, Esteps))
+        np.multiply((logE_hi - logE_lo)[:,np.newaxis], steps[np.newaxis,:], out = logE_array)
+        logE_array += logE_lo[:,np.newaxis]
+
+        # evaluate the optical depth in one go for all bins, 
+        # shape is z.shape + EGrid.shape
+        EGrid = np.exp(logE_array)
+        t_array = self.opt_depth(z,EGrid)
+
+        # spectral weights, shared by numerator and denominator
+        weights = func(EGrid,**params) * EGrid
+
+        # Simpson weights for the equally spaced grid in each bin
+        if Esteps not in self._simps_weights:
+            self._simps_weights[Esteps] = _simpson_weights(Esteps)
+        w_simps = self._simps_weights[Esteps]
+
+        # return averaged tau value, 
+        # the step width (logE_hi - logE_lo) / (Esteps - 1) cancels in the ratio
+        result = _simpson_weighted(np.ascontiguousarray(weights, dtype=np.float64),
+                                    t_array.reshape((-1,) + logE_array.shape),
+                                    w_simps)
+        return result.reshape(np.shape(z) + logE_array.shape[:1])
+
+@functools.lru_cache(maxsize=None)
+def _load_model(model, kx, ky, dtype):
+    """
+    Read an EBL model listed in _MODELS and return the OptDepth instance. 
+    Results are cached, so the returned instance must not be modified.
+    """
+    name, loader = _MODELS[model]
+    file_name = os.path.join(os.path.split(__file__)[0],'data', name)
+
+    # use the binary copy of the parsed table if it is up to date
+    cache = _read_table_cache(file_name)
+    if cache is not None:
+        return OptDepth(*cache, kx=kx, ky=ky, dtype=dtype)
+
+    z, EGeV, tau = loader(file_name)
+    _write_table_cache(file_name, z, EGeV, tau)
+
+    return OptDepth(z,EGeV, tau, kx=kx, ky=ky, dtype=dtype)
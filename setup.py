@@ -17,6 +17,8 @@ setup(
     version=__version__,
     include_package_data = True,
     package_data={'ebltable': ['data/*'], },
+    # binary copies of parsed model tables written by OptDepth.readmodel
+    exclude_package_data={'ebltable': ['data/*.npz'], },
 
     description='Python code to read in and interpolate tables for absorption of high energy gamma rays with additional helper functions',
     long_description=long_description,  #this is the
@@ -51,6 +53,11 @@ setup(
         'numpy >= 1.6',
         'scipy',
         'astropy>=1.2.1',
-    ]
+    ],
+
+    # optional, compiled kernels for the energy bin averaged optical depth
+    extras_require={
+        'numba': ['numba'],
+    },
 
 )